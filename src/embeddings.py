@@ -1,26 +1,220 @@
-from langchain_community.embeddings import HuggingFaceEmbeddings 
+import os
+import hashlib
+import threading
+from typing import List, Optional
+
+import numpy as np
+import onnxruntime as ort
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
 from langchain_core.embeddings import Embeddings
+from transformers import AutoTokenizer
 
 
 EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_MODEL_REPO = f"sentence-transformers/{EMBEDDING_MODEL_NAME}"
+EMBEDDING_BATCH_SIZE = 128
+ONNX_MODEL_ROOT = "./onnx_models"
+# int8 for CPU (VNNI dot products); fp32 for GPUs, where the dynamically quantized ops fall back to CPU
+ONNX_MODEL_FILES = {"int8": "model_quantized.onnx", "fp32": "model.onnx"}
+# CUDA requires the onnxruntime-gpu wheel instead of onnxruntime. CoreML is deliberately not used:
+# with per-batch padded (dynamic) shapes it runs most of the graph on CPU, where int8 is faster.
+GPU_EXECUTION_PROVIDERS = ("CUDAExecutionProvider",)
+MAX_SEQ_LENGTH = 256
+EMBEDDING_CACHE_DIR = "./emb_cache"
+
+
+def get_execution_providers() -> List[str]:
+    """
+    Picks the fastest available ONNX Runtime providers (a GPU provider first, CPU as fallback).
+    """
+    available = ort.get_available_providers()
+    return [p for p in GPU_EXECUTION_PROVIDERS if p in available][:1] + ["CPUExecutionProvider"]
+
 
-def get_embedding_function() -> Embeddings:
+def get_model_variant() -> str:
+    """
+    Returns "fp32" when CUDA is available and "int8" otherwise (CPU, including Apple hosts).
+    """
+    return "int8" if get_execution_providers()[0] == "CPUExecutionProvider" else "fp32"
+
+
+def get_model_dir(variant: str) -> str:
+    """
+    Returns the on-disk directory of the exported ONNX model for the given variant.
+    """
+    return os.path.join(ONNX_MODEL_ROOT, f"{EMBEDDING_MODEL_NAME}-{variant}")
+
+
+def export_onnx_model(variant: str, output_dir: str) -> str:
+    """
+    Exports MiniLM to ONNX, applying dynamic int8 quantization for the "int8" variant (one-off, cached on disk).
+
+    Returns:
+        Path to the exported .onnx file.
+    """
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    print(f"Exporting {EMBEDDING_MODEL_REPO} to {variant} ONNX at {output_dir}...")
+    model = ORTModelForFeatureExtraction.from_pretrained(EMBEDDING_MODEL_REPO, export=True)
+    if variant == "int8":
+        quantizer = ORTQuantizer.from_pretrained(model)
+        quantizer.quantize(
+            save_dir=output_dir,
+            quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        )
+    else:
+        model.save_pretrained(output_dir)
+    # Saving the fast tokenizer writes tokenizer.json, which the Rust backend loads directly
+    AutoTokenizer.from_pretrained(EMBEDDING_MODEL_REPO, use_fast=True).save_pretrained(output_dir)
+    return os.path.join(output_dir, ONNX_MODEL_FILES[variant])
+
+
+class OnnxMiniLMEmbeddings(Embeddings):
+    """
+    MiniLM sentence embeddings served by an ONNX Runtime session (int8 on CPU, fp32 on GPU).
+    Mean-pools the token states and L2-normalizes, matching SentenceTransformers output.
+    """
+
+    def __init__(self, variant: Optional[str] = None, batch_size: int = EMBEDDING_BATCH_SIZE):
+        # The session is created on first use, so building a chain or opening Chroma stays cheap
+        self.variant = variant or get_model_variant()
+        self.model_dir = get_model_dir(self.variant)
+        self.batch_size = batch_size
+        self.tokenizer = None
+        self.session = None
+        self.input_names = set()
+        self._load_lock = threading.Lock()
+        # The fast tokenizer mutates its Rust backend when padding/truncating, so concurrent calls
+        # from sessions sharing this instance must be serialized ("Already borrowed" otherwise)
+        self._tokenizer_lock = threading.Lock()
+
+    def _ensure_loaded(self) -> None:
+        if self.session is not None:
+            return
+        with self._load_lock:
+            if self.session is not None:
+                return
+
+            print(f"Loading embedding model: {EMBEDDING_MODEL_NAME} (ONNX {self.variant}, {get_execution_providers()[0]})...")
+            model_path = os.path.join(self.model_dir, ONNX_MODEL_FILES[self.variant])
+            if not os.path.exists(model_path):
+                model_path = export_onnx_model(self.variant, self.model_dir)
+
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = os.cpu_count() or 1
+
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir, use_fast=True)
+            if not self.tokenizer.is_fast:
+                print(f"Warning: falling back to the slow Python tokenizer for {EMBEDDING_MODEL_NAME}. Install 'tokenizers' for faster embedding.")
+            session = ort.InferenceSession(
+                model_path,
+                sess_options=options,
+                providers=get_execution_providers()
+            )
+            self.input_names = {i.name for i in session.get_inputs()}
+            self.session = session
+            print("Embedding model loaded successfully.")
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        self._ensure_loaded()
+        with self._tokenizer_lock:
+            encoded = self.tokenizer(
+                texts,
+                padding="longest",
+                truncation=True,
+                max_length=MAX_SEQ_LENGTH,
+                return_tensors="np"
+            )
+        inputs = {k: v.astype(np.int64) for k, v in encoded.items() if k in self.input_names}
+        token_states = self.session.run(None, inputs)[0]
+
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_states * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        # Smart batching: group similar-length texts so each batch pads to a short maximum
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        sorted_embeddings = np.vstack([
+            self._embed_batch([texts[i] for i in order[start:start + self.batch_size]])
+            for start in range(0, len(texts), self.batch_size)
+        ])
+
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+        return embeddings.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0].tolist()
+
+
+class PrunableCacheBackedEmbeddings(CacheBackedEmbeddings):
+    """
+    CacheBackedEmbeddings over a LocalFileStore whose keys are a per-model prefix plus a
+    SHA-256 of the text, so entries for texts that left the corpus can be deleted.
+    """
+
+    @classmethod
+    def from_file_store(cls, underlying_embeddings: Embeddings, cache_dir: str, key_prefix: str) -> "PrunableCacheBackedEmbeddings":
+        byte_store = LocalFileStore(cache_dir)
+        embeddings = cls.from_bytes_store(
+            underlying_embeddings=underlying_embeddings,
+            document_embedding_cache=byte_store,
+            key_encoder=lambda text: key_prefix + hashlib.sha256(text.encode("utf-8")).hexdigest()
+        )
+        embeddings.byte_store = byte_store
+        embeddings.key_prefix = key_prefix
+        return embeddings
+
+    def prune(self, texts: List[str]) -> int:
+        """
+        Deletes this model's cached embeddings whose text is not in the given corpus,
+        so the cache never outgrows the current vector store. Other models' entries are left alone.
+
+        Args:
+            texts: The chunk texts that should stay cached.
+
+        Returns:
+            The number of cache entries deleted.
+        """
+        keep = {self.key_prefix + hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts}
+        # yield_keys(prefix=...) treats the prefix as a sub-directory, so filter the flat keys here
+        stale = [
+            key for key in self.byte_store.yield_keys()
+            if key.startswith(self.key_prefix) and key not in keep
+        ]
+        if stale:
+            self.byte_store.mdelete(stale)
+        return len(stale)
+
+
+def get_embedding_function(batch_size: int = EMBEDDING_BATCH_SIZE) -> Embeddings:
     """
     Initializes and returns the chosen embedding function.
+    Document embeddings are cached on disk keyed by a SHA-256 of the chunk text, so
+    rebuilding the vector store from scratch (e.g. after a distance-metric change or a
+    deleted chroma_db) skips the model for known chunks. The model itself is
+    loaded lazily on the first embed call.
+
+    Args:
+        batch_size: Number of texts encoded per forward pass.
     """
-    print(f"Loading embedding model: {EMBEDDING_MODEL_NAME}...")
-    
-    
-    # useing 'SentenceTransformers' via LangChain's wrapper
-    embedding_function = HuggingFaceEmbeddings(
-        model_name=EMBEDDING_MODEL_NAME, 
-        model_kwargs={'device': 'cpu'} 
+    embeddings = OnnxMiniLMEmbeddings(batch_size=batch_size)
+    embedding_function = PrunableCacheBackedEmbeddings.from_file_store(
+        underlying_embeddings=embeddings,
+        cache_dir=EMBEDDING_CACHE_DIR,
+        key_prefix=f"{EMBEDDING_MODEL_NAME}-{embeddings.variant}-"
     )
-    
-    print("Embedding model loaded successfully.")
+
+    print(f"Embedding function for {EMBEDDING_MODEL_NAME} ready (model loads on first use).")
     return embedding_function
 
 if __name__ == "__main__":
     emb_func = get_embedding_function()
     test_vector = emb_func.embed_query("What is RAG?")
-    print(f"\nTest embedding generated. Vector dimension: {len(test_vector)}")
\ No newline at end of file
+    print(f"\nTest embedding generated. Vector dimension: {len(test_vector)}")
@@ -0,0 +1,80 @@
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+# Configuration
+SEMANTIC_CACHE_THRESHOLD = 0.95  # min cosine similarity between questions for a cache hit
+SEMANTIC_CACHE_MAX_ENTRIES = 512
+
+
+class SemanticQueryCache:
+    """
+    In-process cache of RAG answers keyed by the embedding of the user's question alone.
+    A new question whose cosine similarity to a cached one is at least the threshold is
+    answered from the cache instead of running retrieval and the Groq call again.
+    """
+
+    def __init__(self, embedding_function: Embeddings, threshold: float = SEMANTIC_CACHE_THRESHOLD, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        self.embedding_function = embedding_function
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._embeddings: Optional[np.ndarray] = None
+        self._responses = []
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Drops all cached answers (e.g. after the knowledge base is re-ingested)."""
+        with self._lock:
+            self._embeddings = None
+            self._responses = []
+
+    def _lookup(self, query_embedding: np.ndarray) -> Optional[Dict[str, Any]]:
+        if self._embeddings is None:
+            return None
+        # Embeddings are L2-normalized, so the dot product is the cosine similarity
+        similarities = self._embeddings @ query_embedding
+        best = int(np.argmax(similarities))
+        return self._responses[best] if similarities[best] >= self.threshold else None
+
+    def _store(self, query_embedding: np.ndarray, response: Dict[str, Any]) -> None:
+        if self._embeddings is None:
+            self._embeddings = query_embedding[None, :]
+        else:
+            self._embeddings = np.vstack([self._embeddings, query_embedding])[-self.max_entries:]
+        self._responses = (self._responses + [response])[-self.max_entries:]
+
+    def invoke(self, qa_chain: Any, query: str) -> Dict[str, Any]:
+        """
+        Returns a cached answer for a near-duplicate question, otherwise runs the chain and caches its answer.
+
+        Args:
+            qa_chain: The RetrievalQA chain to run on a cache miss.
+            query: The user's question.
+
+        Returns:
+            A response dict with 'query', 'result' and 'source_documents'.
+        """
+        query_embedding = np.asarray(self.embedding_function.embed_query(query), dtype=np.float32)
+
+        with self._lock:
+            cached = self._lookup(query_embedding)
+        if cached is not None:
+            print("Semantic cache hit: answering from a previous near-identical question.")
+            return {**cached, "query": query}
+
+        # Hand the embedding to the retriever so the miss path does not embed the question twice
+        retriever = getattr(qa_chain, "retriever", None)
+        if hasattr(retriever, "remember_query_embedding"):
+            retriever.remember_query_embedding(query, query_embedding)
+
+        response = qa_chain.invoke({"query": query})
+        with self._lock:
+            self._store(query_embedding, {
+                "query": query,
+                "result": response["result"],
+                "source_documents": response["source_documents"]
+            })
+        return response
@@ -1,14 +1,18 @@
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
+import chromadb
+import httpx
 from langchain_groq import ChatGroq
-from langchain_community.vectorstores import Chroma
 from langchain.chains import RetrievalQA
+from langchain_core.embeddings import Embeddings
 from langchain_core.prompts import ChatPromptTemplate
 
 from src.embeddings import get_embedding_function
-from src.vectorstore import CHROMA_DB_PATH, CHROMA_COLLECTION_NAME 
+from src.query_cache import SemanticQueryCache
+from src.retriever import NumpyMMRRetriever
+from src.vectorstore import CHROMA_DB_PATH, CHROMA_COLLECTION_NAME
 
 
 load_dotenv()
@@ -16,47 +20,67 @@ load_dotenv()
 
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
 K_RETRIEVAL = 5 
-
-RAG_PROMPT_TEMPLATE = """You are an expert Q&A assistant. Your goal is to answer the user's question 
+GROQ_HTTP_TIMEOUT = 30
+GROQ_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=50, keepalive_expiry=60)
+# One long-lived pooled HTTP/2 client for the whole process, shared by every chain rebuild,
+# so queries reuse warm TLS connections
+GROQ_HTTP_CLIENT = httpx.Client(limits=GROQ_HTTP_LIMITS, http2=True)
+
+# Static instructions go first as a byte-identical system message so the provider can
+# cache the prefix; the per-query context and question are appended strictly at the end.
+RAG_SYSTEM_PROMPT = """You are an expert Q&A assistant. Your goal is to answer the user's question 
 based ONLY on the provided context, which consists of research paper and web snippets.
 If the context does not contain the answer, state clearly that you cannot find the answer in the provided documents.
 For every fact you state, cite the 'title' and 'source' from the metadata of the document(s) you used.
+"""
 
-CONTEXT:
+RAG_PROMPT_TEMPLATE = """CONTEXT:
 {context}
 
 QUESTION:
 {question}
 """
 
-def build_rag_chain() -> RetrievalQA:
+def build_rag_chain(embedding_func: Optional[Embeddings] = None) -> RetrievalQA:
     """
     Initializes the RAG components (LLM, Embeddings, Vector Store) and builds the RetrievalQA chain.
+
+    Args:
+        embedding_func: An already-loaded embedding function to reuse; loaded fresh if omitted.
     """
     print("--- Initializing RAG Pipeline Components ---")
 
    
    
-    embedding_func = get_embedding_function()
+    if embedding_func is None:
+        embedding_func = get_embedding_function()
 
    
     if not os.path.exists(CHROMA_DB_PATH):
         raise FileNotFoundError(f"ChromaDB not found at {CHROMA_DB_PATH}. Please run src/vectorstore.py first.")
         
-    vectordb = Chroma(
-        persist_directory=CHROMA_DB_PATH,
-        collection_name=CHROMA_COLLECTION_NAME,
-        embedding_function=embedding_func
-    )
+    # Opened read-only: the HNSW metadata is set (and migrated) by create_vector_store alone
+    client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+    try:
+        collection = client.get_collection(CHROMA_COLLECTION_NAME)
+    except Exception:
+        raise FileNotFoundError(f"Collection '{CHROMA_COLLECTION_NAME}' not found in {CHROMA_DB_PATH}. Please run src/vectorstore.py first.")
     print("ChromaDB loaded successfully.")
 
-    retriever = vectordb.as_retriever(
-        search_type="similarity", 
-        search_kwargs={"k": K_RETRIEVAL}
+    retriever = NumpyMMRRetriever(
+        collection=collection,
+        embedding_function=embedding_func,
+        k=K_RETRIEVAL
+    )
+    print(f"Retriever configured to fetch top {K_RETRIEVAL} chunks (MMR over {retriever.fetch_k} candidates).")
+
+    # The Groq SDK sends its own per-request timeout, so it is set here rather than on the httpx client
+    llm = ChatGroq(
+        model_name=GROQ_MODEL,
+        temperature=0, #factual
+        request_timeout=GROQ_HTTP_TIMEOUT,
+        http_client=GROQ_HTTP_CLIENT
     )
-    print(f"Retriever configured to fetch top {K_RETRIEVAL} chunks.")
-
-    llm = ChatGroq(model_name=GROQ_MODEL, temperature=0) #factual
     print(f"Groq LLM initialized with model: {GROQ_MODEL}")
 
     
@@ -65,19 +89,26 @@ def build_rag_chain() -> RetrievalQA:
         chain_type="stuff",
         retriever=retriever,
         return_source_documents=True,
-        chain_type_kwargs={"prompt": ChatPromptTemplate.from_template(RAG_PROMPT_TEMPLATE)}
+        chain_type_kwargs={"prompt": ChatPromptTemplate.from_messages([
+            ("system", RAG_SYSTEM_PROMPT),
+            ("human", RAG_PROMPT_TEMPLATE)
+        ])}
     )
 
     print("RetrievalQA Chain built successfully.")
     return qa_chain
 
-def run_rag_query(qa_chain: RetrievalQA, query: str):
+def run_rag_query(qa_chain: RetrievalQA, query: str, query_cache: Optional[SemanticQueryCache] = None):
     """
     Executes a query against the RAG chain and prints the results.
+    Near-duplicate questions are answered from query_cache when one is given.
     """
     print(f"\n--- Running Query: '{query}' ---")
     
-    response = qa_chain.invoke({"query": query})
+    if query_cache is not None:
+        response = query_cache.invoke(qa_chain, query)
+    else:
+        response = qa_chain.invoke({"query": query})
 
     print("\n[--- FINAL LLM ANSWER ---]")
     print(response['result'])
@@ -96,7 +127,7 @@ def run_rag_query(qa_chain: RetrievalQA, query: str):
 
 
 
-def run_evaluation_suite(qa_chain: RetrievalQA, test_set: List[Dict[str, str]]):
+def run_evaluation_suite(qa_chain: RetrievalQA, test_set: List[Dict[str, str]], query_cache: Optional[SemanticQueryCache] = None):
     """
     Runs a batch of queries for manual evaluation and logs results.
     """
@@ -111,7 +142,7 @@ def run_evaluation_suite(qa_chain: RetrievalQA, test_set: List[Dict[str, str]]):
         query = test_case["query"]
         
        
-        response = run_rag_query(qa_chain, query)
+        response = run_rag_query(qa_chain, query, query_cache)
         
         
         sources = [
@@ -171,7 +202,7 @@ if __name__ == "__main__":
         rag_chain = build_rag_chain()
         
        
-        run_evaluation_suite(rag_chain, TEST_QUERIES)
+        run_evaluation_suite(rag_chain, TEST_QUERIES, SemanticQueryCache(rag_chain.retriever.embedding_function))
 
     except FileNotFoundError as e:
         print(f"\nFATAL ERROR: {e}")
@@ -0,0 +1,96 @@
+from typing import Any, Dict, List
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict, PrivateAttr
+
+
+# Configuration
+FETCH_K = 20
+MMR_LAMBDA = 0.5
+QUERY_EMBEDDING_MEMO_SIZE = 64
+
+
+def maximal_marginal_relevance(query_embedding: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float = MMR_LAMBDA) -> List[int]:
+    """
+    Selects k diverse candidates with MMR. Vectors are assumed L2-normalized, so dot products are cosine similarities.
+
+    Args:
+        query_embedding: Query vector of shape (dim,).
+        candidates: Candidate vectors of shape (n, dim).
+        k: Number of candidates to select.
+        lambda_mult: Trade-off between relevance (1.0) and diversity (0.0).
+
+    Returns:
+        Indices into candidates, in selection order.
+    """
+    n = len(candidates)
+    if n == 0 or k <= 0:
+        return []
+
+    # All similarities are computed once up front; the loop only updates a running max
+    query_sim = candidates @ query_embedding
+    pairwise_sim = candidates @ candidates.T
+
+    selected = [int(np.argmax(query_sim))]
+    chosen = np.zeros(n, dtype=bool)
+    chosen[selected[0]] = True
+    max_sim_to_selected = pairwise_sim[selected[0]].copy()
+
+    while len(selected) < min(k, n):
+        scores = lambda_mult * query_sim - (1 - lambda_mult) * max_sim_to_selected
+        scores[chosen] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        chosen[best] = True
+        np.maximum(max_sim_to_selected, pairwise_sim[best], out=max_sim_to_selected)
+
+    return selected
+
+
+class NumpyMMRRetriever(BaseRetriever):
+    """
+    Retriever that queries a raw chromadb collection with a pre-computed query embedding
+    and re-ranks the fetched candidates with a vectorized MMR pass.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    collection: Any
+    embedding_function: Embeddings
+    k: int = 5
+    fetch_k: int = FETCH_K
+    lambda_mult: float = MMR_LAMBDA
+
+    _query_embeddings: Dict[str, np.ndarray] = PrivateAttr(default_factory=dict)
+
+    def remember_query_embedding(self, query: str, embedding: np.ndarray) -> None:
+        """
+        Lets a caller that already embedded the query (e.g. the semantic cache) spare the retriever re-embedding it.
+        """
+        self._query_embeddings[query] = embedding
+        while len(self._query_embeddings) > QUERY_EMBEDDING_MEMO_SIZE:
+            self._query_embeddings.pop(next(iter(self._query_embeddings)), None)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        query_embedding = self._query_embeddings.pop(query, None)
+        if query_embedding is None:
+            query_embedding = np.asarray(self.embedding_function.embed_query(query), dtype=np.float32)
+
+        results = self.collection.query(
+            query_embeddings=[query_embedding.tolist()],
+            n_results=max(self.k, self.fetch_k),
+            include=["embeddings", "documents", "metadatas"]
+        )
+        documents = results["documents"][0]
+        metadatas = results["metadatas"][0]
+        if not documents:
+            return []
+
+        candidates = np.asarray(results["embeddings"][0], dtype=np.float32)
+        selected = maximal_marginal_relevance(query_embedding, candidates, self.k, self.lambda_mult)
+
+        return [Document(page_content=documents[i], metadata=metadatas[i] or {}) for i in selected]
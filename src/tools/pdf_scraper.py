@@ -1,7 +1,9 @@
-import pdfplumber
-import re
+import pypdfium2 as pdfium
+import re2
 import os
+import io
 import json
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, Any
 
 # --- Configuration ---
@@ -9,19 +11,18 @@ PROCESSED_DATA_DIR = "data/papers/processed"
 os.makedirs(PROCESSED_DATA_DIR, exist_ok=True)
 
 # --- Heuristic Regex Patterns ---
-ABSTRACT_REGEX = re.compile(
-    r"abstract\s*(.*?)(?:^\s*1\s*introduction|^introduction|^\s*[A-Z][a-z]+[A-Z][a-z]+|^keywords|^\s*i\s*introduction)", 
-    flags=re.I | re.M | re.S
+# RE2 matches in linear time, so the lazy .*? spans cannot backtrack catastrophically on long PDFs.
+# Flags are inline ((?ims) = ignore case, multiline, dot-all) since re2 takes no re.* flag ints.
+ABSTRACT_REGEX = re2.compile(
+    r"(?ims)abstract\s*(.*?)(?:^\s*1\s*introduction|^introduction|^\s*[A-Z][a-z]+[A-Z][a-z]+|^keywords|^\s*i\s*introduction)"
 )
 
-INTRO_REGEX = re.compile(
-    r"(?:^\s*1\s*introduction|^introduction)(.*?)(?:^\s*[2-9]\s*[A-Z\s]+|^\s*[a-z]\s*\.)", 
-    flags=re.I | re.M | re.S
+INTRO_REGEX = re2.compile(
+    r"(?ims)(?:^\s*1\s*introduction|^introduction)(.*?)(?:^\s*[2-9]\s*[A-Z\s]+|^\s*[a-z]\s*\.)"
 )
 
-CONCLUSION_REGEX = re.compile(
-    r"(?:^conclusion|^conclusions)(.*?)(?:^\s*acknowledgements|^references|^\s*appendix)", 
-    flags=re.I | re.M | re.S
+CONCLUSION_REGEX = re2.compile(
+    r"(?ims)(?:^conclusion|^conclusions)(.*?)(?:^\s*acknowledgements|^references|^\s*appendix)"
 )
 
 
@@ -54,31 +55,44 @@ def extract_pdf_sections(path: str) -> Dict[str, Any]:
         return metadata
 
     try:
-        with pdfplumber.open(path) as pdf:
-            full_text_list = [page.extract_text() or "" for page in pdf.pages]
-            full_text = "\n".join(full_text_list)
-            
-            normalized_text = full_text.lower()
-            
-            first_page_text = full_text_list[0]
-            metadata["title"] = first_page_text.split('\n')[0].strip()
+        pdf = pdfium.PdfDocument(path)
+        try:
+            # Whitespace is normalized line by line as pages stream in, so the text is
+            # held once; newlines are kept for the ^-anchored section regexes.
+            buffer = io.StringIO()
+            for i in range(len(pdf)):
+                page = pdf[i]
+                textpage = page.get_textpage()
+                lines = [" ".join(line.split()) for line in textpage.get_text_range().splitlines()]
+                textpage.close()
+                page.close()
+
+                lines = [line for line in lines if line]
+                if i == 0:
+                    metadata["title"] = lines[0] if lines else ""
+                if lines:
+                    buffer.write("\n".join(lines))
+                    buffer.write("\n")
+
+            full_text = buffer.getvalue()
+            buffer.close()
 
             
-            def safe_search(regex: re.Pattern, text: str, default: str = "") -> str:
+            def safe_search(regex: Any, text: str, default: str = "") -> str:
                 """Helper function to run regex search and return cleaned group 1."""
                 match = regex.search(text)
                 if match:
                     return " ".join(match.group(1).strip().split())
                 return default
 
-            metadata["abstract"] = safe_search(ABSTRACT_REGEX, normalized_text)
-            metadata["introduction"] = safe_search(INTRO_REGEX, normalized_text)
-            metadata["conclusion"] = safe_search(CONCLUSION_REGEX, normalized_text)
+            metadata["abstract"] = safe_search(ABSTRACT_REGEX, full_text)
+            metadata["introduction"] = safe_search(INTRO_REGEX, full_text)
+            metadata["conclusion"] = safe_search(CONCLUSION_REGEX, full_text)
+
+            metadata["full_text"] = full_text.replace("\n", " ").strip()
 
             if not metadata["abstract"]:
-                metadata["abstract"] = " ".join(full_text.split()[:150])
-                
-            metadata["full_text"] = " ".join(full_text.split())
+                metadata["abstract"] = " ".join(metadata["full_text"].split(" ", 150)[:150])
             
             doc_id = os.path.basename(path).replace(".pdf", "").replace(" ", "_").lower()
             output_path = os.path.join(PROCESSED_DATA_DIR, f"{doc_id}_processed.json")
@@ -89,6 +103,8 @@ def extract_pdf_sections(path: str) -> Dict[str, Any]:
             print(f"Successfully extracted. Abstract length: {len(metadata['abstract'])}. Saved metadata to: {output_path}")
             
             return metadata
+        finally:
+            pdf.close()
 
     except Exception as e:
         metadata["error"] = f"Error processing PDF: {e}"
@@ -113,10 +129,8 @@ if __name__ == "__main__":
         
         sample_to_test = test_papers[:5]
         
-        results = []
-        for path in sample_to_test:
-            result = extract_pdf_sections(path)
-            results.append(result)
+        with ProcessPoolExecutor(max_workers=min(len(sample_to_test), os.cpu_count() or 1)) as executor:
+            results = list(executor.map(extract_pdf_sections, sample_to_test))
             
         print("\n--- Summary of PDF Results ---")
         for r in results:
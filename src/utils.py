@@ -71,20 +71,17 @@ def split_text_into_chunks(documents: List[Dict[str, Any]]) -> List[Document]:
     """
     splitter = get_text_splitter()
     
-    chunks = []
-    
-    for doc in documents:
-        content_text = doc.get('full_text') or doc.get('text')
-        
-        if not content_text:
-            continue
-            
-        metadata = {k: v for k, v in doc.items() if k not in ['text', 'full_text']}
+    source_documents = [
+        Document(
+            page_content=doc.get('full_text') or doc.get('text'),
+            metadata={k: v for k, v in doc.items() if k not in ['text', 'full_text']}
+        )
+        for doc in documents
+        if doc.get('full_text') or doc.get('text')
+    ]
 
-        source_document = Document(page_content=content_text, metadata=metadata)
-        
-        doc_chunks = splitter.split_documents([source_document])
-        chunks.extend(doc_chunks)
+    # One call over all documents instead of re-entering the splitter per document
+    chunks = splitter.split_documents(source_documents)
 
     print(f"Original documents split into a total of {len(chunks)} chunks.")
     return chunks
@@ -1,47 +1,111 @@
 import os
 import shutil
+import hashlib
+import chromadb
 from typing import List, Any
 from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
 from src.utils import load_processed_data, split_text_into_chunks
-from src.embeddings import get_embedding_function
+from src.embeddings import get_embedding_function, PrunableCacheBackedEmbeddings
+from src.retriever import NumpyMMRRetriever
 
 
 # Configuration
 CHROMA_DB_PATH = "./chroma_db"
 CHROMA_COLLECTION_NAME = "rag_capstone_collection_v1"
+CHROMA_INSERT_BATCH_SIZE = 5000
+# Embeddings are L2-normalized, so cosine distance reduces to an inner product in HNSW
+CHROMA_COLLECTION_METADATA = {"hnsw:space": "cosine", "hnsw:construction_ef": 200, "hnsw:M": 32}
+
+
+def get_chunk_id(chunk: Document) -> str:
+    """
+    Returns a deterministic ID derived from the chunk's provenance (source plus URL or path) and text,
+    so the same passage in two documents is stored, and cited, once per document.
+    """
+    provenance = chunk.metadata.get("url") or chunk.metadata.get("path") or chunk.metadata.get("title", "")
+    key = f"{chunk.metadata.get('source', '')}\0{provenance}\0{chunk.page_content}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
 
 
 def create_vector_store(chunks: List[Document], embedding_function: Any):
     """
-    Truncates and rebuilds a Chroma vector store from a list of LangChain Documents.
+    Syncs a Chroma vector store to exactly the given list of LangChain Documents.
+    Chunks are keyed by a hash of provenance and content, so only removed chunks are deleted and only
+    new ones are embedded; kept chunks get their metadata refreshed (e.g. a re-fetched page's title).
     """
     print(f"\nStarting ChromaDB update at: {CHROMA_DB_PATH}")
 
+    client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
+
+    # HNSW settings are fixed at creation, so a collection built with the old L2 space is recreated.
+    # It is inspected before opening with the new metadata, which some chromadb versions would overwrite.
+    try:
+        existing_collection = client.get_collection(CHROMA_COLLECTION_NAME)
+    except Exception:
+        existing_collection = None
+    if existing_collection is not None and (existing_collection.metadata or {}).get("hnsw:space") != CHROMA_COLLECTION_METADATA["hnsw:space"]:
+        print("Existing collection uses a different distance metric. Recreating it.")
+        client.delete_collection(CHROMA_COLLECTION_NAME)
+
     vectordb = Chroma(
-        persist_directory=CHROMA_DB_PATH,
+        client=client,
         collection_name=CHROMA_COLLECTION_NAME,
-        embedding_function=embedding_function
+        embedding_function=embedding_function,
+        collection_metadata=CHROMA_COLLECTION_METADATA
     )
 
+    # Only identical texts within the same document collapse onto one ID; the first occurrence is kept
+    chunks_by_id = {}
+    for chunk in chunks:
+        chunks_by_id.setdefault(get_chunk_id(chunk), chunk)
+
+    existing_ids = set()
     try:
-        existing = vectordb.get()
-        ids = existing.get("ids", [])
-        print(f"Found {len(ids)} existing documents.")
-        if ids:
-            vectordb.delete(ids=ids)
-            vectordb.persist()
-            print("Existing documents deleted.")
-        else:
-            print("No documents to delete.")
+        existing_ids = set(vectordb._collection.get(include=[])["ids"])
+        stale_ids = list(existing_ids - chunks_by_id.keys())
+        print(f"Found {len(existing_ids)} existing documents, {len(stale_ids)} no longer present.")
+        for i in range(0, len(stale_ids), CHROMA_INSERT_BATCH_SIZE):
+            vectordb._collection.delete(ids=stale_ids[i:i + CHROMA_INSERT_BATCH_SIZE])
+        if stale_ids:
+            print("Stale documents deleted.")
     except Exception as e:
         print(f"Error while deleting documents: {e}")
 
-    print(f"Adding {len(chunks)} new chunks...")
-    vectordb.add_documents(chunks)
-    vectordb.persist()
+    # Kept chunks are not re-embedded, but their metadata may have changed since they were added
+    kept_ids = [chunk_id for chunk_id in chunks_by_id if chunk_id in existing_ids]
+    try:
+        for i in range(0, len(kept_ids), CHROMA_INSERT_BATCH_SIZE):
+            batch_ids = kept_ids[i:i + CHROMA_INSERT_BATCH_SIZE]
+            vectordb._collection.update(
+                ids=batch_ids,
+                metadatas=[chunks_by_id[chunk_id].metadata for chunk_id in batch_ids]
+            )
+    except Exception as e:
+        print(f"Error while updating document metadata: {e}")
+
+    new_ids = [chunk_id for chunk_id in chunks_by_id if chunk_id not in existing_ids]
+    print(f"Adding {len(new_ids)} new chunks ({len(kept_ids)} unchanged)...")
+
+    # Embed and insert one bounded batch at a time so only one batch of vectors is held in memory;
+    # the PersistentClient writes through to disk, so no explicit persist() is needed
+    for i in range(0, len(new_ids), CHROMA_INSERT_BATCH_SIZE):
+        batch_ids = new_ids[i:i + CHROMA_INSERT_BATCH_SIZE]
+        texts = [chunks_by_id[chunk_id].page_content for chunk_id in batch_ids]
+        vectordb._collection.add(
+            ids=batch_ids,
+            embeddings=embedding_function.embed_documents(texts),
+            documents=texts,
+            metadatas=[chunks_by_id[chunk_id].metadata for chunk_id in batch_ids]
+        )
+
     print("ChromaDB updated successfully.")
 
+    # Chroma already keeps unchanged chunks, so the embedder's cache only needs the current corpus
+    if isinstance(embedding_function, PrunableCacheBackedEmbeddings):
+        pruned = embedding_function.prune([chunk.page_content for chunk in chunks_by_id.values()])
+        print(f"Pruned {pruned} stale cached embeddings.")
+
     return vectordb
     
     
@@ -55,7 +119,11 @@ def run_simple_similarity_query(vectordb: Chroma, query: str = "What are the cor
     Runs a simple similarity search against the new vector store.
     """
     print("\n--- Running Simple Similarity Query (Checkpoint E Test) ---")
-    retriever = vectordb.as_retriever(search_kwargs={"k": 3})
+    retriever = NumpyMMRRetriever(
+        collection=vectordb._collection,
+        embedding_function=vectordb.embeddings,
+        k=3
+    )
     results = retriever.invoke(query)
     
     print(f"Query: '{query}'")
@@ -1,12 +1,18 @@
 import streamlit as st
+import asyncio
 import os
 import sys
+import multiprocessing
+import time
+from typing import Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
 from src.tools.pdf_scraper import extract_pdf_sections
-from src.tools.web_crawler import fetch_page_text
+from src.tools.web_crawler import fetch_all, save_page
 from src.utils import load_processed_data, split_text_into_chunks
 from src.embeddings import get_embedding_function
 from src.vectorstore import create_vector_store
+from src.query_cache import SemanticQueryCache
 
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
@@ -24,6 +30,61 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 
 # --- Streamlit Caching ---
+@st.cache_resource
+def cached_embedding_function():
+    """
+    Loads the embedding model once per server process and shares it between ingest and querying.
+    """
+    return get_embedding_function()
+
+
+PAGE_CACHE_TTL = 3600  # seconds
+
+
+@st.cache_resource
+def load_page_cache() -> Dict[str, Tuple[float, dict]]:
+    """
+    Successfully fetched pages keyed by URL (with fetch time), shared across sessions.
+    """
+    return {}
+
+
+def cached_fetch_pages(urls: List[str]) -> List[dict]:
+    """
+    Returns pages fetched within the last hour from the per-URL cache and fetches only
+    the misses, concurrently. Failed fetches are never cached, so they retry next time,
+    and expired entries are dropped on every call.
+    """
+    page_cache = load_page_cache()
+    now = time.time()
+    # Expired pages are evicted here so the shared dict only ever holds the last hour's fetches
+    for url in [url for url, (fetched_at, _) in list(page_cache.items()) if now - fetched_at >= PAGE_CACHE_TTL]:
+        page_cache.pop(url, None)
+
+    # A single get per URL, since another session may evict entries concurrently
+    pages = {}
+    for url in urls:
+        entry = page_cache.get(url)
+        if entry is not None and now - entry[0] < PAGE_CACHE_TTL:
+            pages[url] = entry[1]
+
+    misses = [url for url in dict.fromkeys(urls) if url not in pages]
+    for page in asyncio.run(fetch_all(misses)):
+        if page.get("title") != "ERROR":
+            page_cache[page["url"]] = (now, page)
+        pages[page["url"]] = page
+
+    return [pages[url] for url in urls]
+
+
+@st.cache_resource
+def load_query_cache():
+    """
+    Semantic cache of answers keyed by the question's embedding, shared across sessions.
+    """
+    return SemanticQueryCache(cached_embedding_function())
+
+
 @st.cache_resource
 def load_rag_chain():
     """
@@ -44,7 +105,7 @@ def load_rag_chain():
     with st.spinner("Initializing RAG components (LLM, Embeddings, Vector Store)..."):
         try:
             
-            return build_rag_chain()
+            return build_rag_chain(embedding_func=cached_embedding_function())
         except Exception as e:
             st.error(f"Error during RAG chain initialization: {e}")
             return None
@@ -91,8 +152,6 @@ import glob
 if submitted:
     with st.spinner("Processing uploaded data..."):
         
-        st.cache_resource.clear()
-
        
         pdf_dir = "data/papers"
         if os.path.exists(pdf_dir):
@@ -111,23 +170,43 @@ if submitted:
 
         
         if uploaded_pdfs:
+            pdf_paths = []
             for pdf in uploaded_pdfs:
                 pdf_path = os.path.join(pdf_dir, pdf.name)
                 with open(pdf_path, "wb") as f:
                     f.write(pdf.read())
-                extract_pdf_sections(pdf_path)
+                pdf_paths.append(pdf_path)
+
+            # PDF parsing is CPU-bound, so fan out across processes rather than threads.
+            # Workers are spawned, not forked: this server process runs many threads.
+            if len(pdf_paths) == 1:
+                extract_pdf_sections(pdf_paths[0])
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=min(len(pdf_paths), os.cpu_count() or 1),
+                    mp_context=multiprocessing.get_context("spawn")
+                ) as executor:
+                    list(executor.map(extract_pdf_sections, pdf_paths))
 
         if url_input.strip():
-            for url in url_input.strip().splitlines():
-                if url.strip():
-                    fetch_page_text(url.strip())
+            urls = [url.strip() for url in url_input.strip().splitlines() if url.strip()]
+            # Cached results skip the fetch, so re-write their JSON into the freshly cleared web_dir
+            for page in cached_fetch_pages(urls):
+                if page.get("title") != "ERROR":
+                    save_page(page)
 
         
         docs = load_processed_data()
         chunks = split_text_into_chunks(docs)
-        embedding_func = get_embedding_function()
+        embedding_func = cached_embedding_function()
         create_vector_store(chunks, embedding_func)
 
+        # Cleared only once the store is synced: until then other sessions still answer from the old
+        # chain, and anything they cache mid-sync must not outlive the ingest.
+        # Only the chain is rebuilt; the cached embedding model is kept.
+        load_rag_chain.clear()
+        load_query_cache().clear()
+
         st.success("Previous data cleared. New data ingested and vector store updated successfully!")
         st.rerun()
 
@@ -165,7 +244,7 @@ if prompt := st.chat_input("Ask a question about your research papers or web art
         with st.spinner("Searching and generating response... (Groq is fast!)"):
             try:
                
-                response = qa_chain.invoke({"query": prompt})
+                response = load_query_cache().invoke(qa_chain, prompt)
 
                 llm_answer = response['result']
                 source_documents = response['source_documents']